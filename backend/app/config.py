@@ -1,28 +1,44 @@
-"""Application configuration using Pydantic Settings."""
+"""Application configuration loaded from environment variables."""
 
-from functools import lru_cache
+import os
+from dataclasses import dataclass, fields
+from functools import cached_property, lru_cache
 from typing import List
 
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from dotenv import load_dotenv
 
+_TRUE_VALUES = {"1", "true", "t", "yes", "y", "on"}
+_FALSE_VALUES = {"0", "false", "f", "no", "n", "off", ""}
 
-class Settings(BaseSettings):
+
+def _parse_bool(value: str) -> bool:
+    """Parse a boolean environment variable value."""
+    normalized = value.strip().lower()
+    if normalized in _TRUE_VALUES:
+        return True
+    if normalized in _FALSE_VALUES:
+        return False
+    raise ValueError(f"Invalid boolean value: {value!r}")
+
+
+@dataclass(frozen=True)
+class Settings:
     """Application settings loaded from environment variables."""
     
-    model_config = SettingsConfigDict(
-        env_file=".env",
-        env_file_encoding="utf-8",
-        extra="ignore",
-    )
-    
     # Server
     backend_host: str = "0.0.0.0"
     backend_port: int = 8000
     debug: bool = True
     
+    # Log every SQL statement (noisy and slow; enable only to debug queries)
+    sql_echo: bool = False
+    
     # Database
     database_url: str = "sqlite+aiosqlite:///./llm_council.db"
     
+    # Max concurrent LLM requests per provider (avoids rate-limit retries)
+    provider_max_concurrency: int = 8
+    
     # LLM API Keys (read from environment)
     # Add your API keys to .env file to enable models from each provider
     openai_api_key: str = ""
@@ -40,13 +56,37 @@ class Settings(BaseSettings):
     aws_access_key_id: str = ""  # For Amazon Bedrock
     azure_api_key: str = ""
     
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Build settings from environment variables (case-insensitive).
+        
+        Variables from .env are loaded first without overriding ones already
+        set. Only variables that are actually set are parsed; missing ones
+        keep their defaults.
+        """
+        load_dotenv(".env", override=False)
+        env = {key.lower(): value for key, value in os.environ.items()}
+        values = {}
+        for f in fields(cls):
+            raw = env.get(f.name)
+            if raw is None:
+                continue
+            if f.type is bool:
+                values[f.name] = _parse_bool(raw)
+            elif f.type is int:
+                values[f.name] = int(raw)
+            else:
+                values[f.name] = raw
+        return cls(**values)
+    
     # Available models configuration - now dynamically loaded from LiteLLM
-    @property
+    @cached_property
     def enabled_models(self) -> List[dict]:
         """Return list of enabled models based on available API keys.
         
         Models are now dynamically loaded from LiteLLM's model_cost dictionary.
         This property returns featured models for backwards compatibility.
+        The list is built once per settings instance and cached.
         """
         from app.services.model_registry import model_registry
         
@@ -65,5 +105,18 @@ class Settings(BaseSettings):
 
 @lru_cache
 def get_settings() -> Settings:
-    """Get cached settings instance."""
-    return Settings()
+    """Get cached settings instance.
+    
+    Uses app/_frozen_settings.py when present (generated at build time by
+    scripts/freeze_settings.py), otherwise parses the environment.
+    """
+    try:
+        from app._frozen_settings import FROZEN_SETTINGS
+    except ImportError:
+        return Settings.from_env()
+    
+    # LiteLLM reads provider API keys from the environment
+    for name, value in FROZEN_SETTINGS.items():
+        if value and name.endswith(("_api_key", "_key_id")):
+            os.environ.setdefault(name.upper(), value)
+    return Settings(**FROZEN_SETTINGS)
@@ -1,19 +1,50 @@
 """Database connection and session management."""
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase
 
 from app.config import get_settings
 
 settings = get_settings()
 
+# Size the pool so concurrent WebSocket chats don't queue on the default 5
+# connections (in-memory SQLite uses a single static connection instead)
+engine_options = {}
+if make_url(settings.database_url).database not in (None, "", ":memory:"):
+    engine_options.update(pool_size=20, max_overflow=0)
+
 # Create async engine
 engine = create_async_engine(
     settings.database_url,
-    echo=settings.debug,
+    echo=settings.sql_echo,
+    echo_pool=False,
     future=True,
+    **engine_options,
 )
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Use WAL and relaxed fsync so per-turn commits stay cheap.
+        
+        Foreign keys are enforced so ON DELETE CASCADE removes a
+        conversation's messages in the database.
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
+
 # Session factory
 async_session_maker = async_sessionmaker(
     engine,
@@ -36,7 +67,16 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+def _create_missing_indexes(conn) -> None:
+    """Create indexes added after a table was first created."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
 async def init_db():
-    """Create all database tables."""
+    """Create all database tables and any missing indexes."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # create_all() skips indexes on tables that already exist
+        await conn.run_sync(_create_missing_indexes)
@@ -4,54 +4,99 @@ import uuid
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import DateTime, ForeignKey, String, Text, Integer, JSON, Boolean
+from sqlalchemy import DateTime, ForeignKey, Index, String, Text, Integer, JSON, Boolean, text
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.sql.expression import FunctionElement
 
 from app.db.database import Base
 
 
+class utcnow(FunctionElement):
+    """Current UTC timestamp, evaluated by the database.
+    
+    Unlike CURRENT_TIMESTAMP on SQLite, this keeps sub-second precision so
+    messages created within the same second still sort in insert order.
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "sqlite")
+def _utcnow_sqlite(element, compiler, **kw):
+    return "STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW')"
+
+
+@compiles(utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw):
+    return "TIMEZONE('utc', CLOCK_TIMESTAMP())"
+
+
 def generate_uuid() -> str:
-    """Generate a new UUID string."""
-    return str(uuid.uuid4())
+    """Generate a new UUID as a 32-character hex string (no hyphens)."""
+    return uuid.uuid4().hex
 
 
 class Conversation(Base):
     """A conversation containing multiple message exchanges."""
     
     __tablename__ = "conversations"
+    __table_args__ = (
+        # History sidebar lists conversations by most recent activity
+        Index("ix_conv_updated", "updated_at"),
+    )
+    # Fetch server-generated timestamps in the INSERT/UPDATE itself
+    # (RETURNING) instead of a follow-up SELECT
+    __mapper_args__ = {"eager_defaults": True}
     
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=generate_uuid)
+    id: Mapped[str] = mapped_column(String(32), primary_key=True, default=generate_uuid)
     title: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # default= renders utcnow() into each INSERT as well, so tables created
+    # before the server defaults existed still get timestamps
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=utcnow(), server_default=utcnow()
+    )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+        DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow()
     )
     
     # Relationships
     messages: Mapped[List["Message"]] = relationship(
         "Message", back_populates="conversation", cascade="all, delete-orphan",
-        order_by="Message.created_at"
+        order_by="Message.created_at", lazy="raise", passive_deletes=True
     )
-    
-    def to_dict(self) -> dict:
-        """Convert to dictionary for JSON serialization."""
-        return {
-            "id": self.id,
-            "title": self.title,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-            "message_count": len(self.messages) if self.messages else 0,
-        }
 
 
 class Message(Base):
     """A single message in a conversation (user prompt or model response)."""
     
     __tablename__ = "messages"
+    __table_args__ = (
+        # Loading a conversation's messages in order (every chat turn)
+        Index("ix_messages_conv_created", "conversation_id", "created_at"),
+        # Usage aggregation over assistant responses in a time window
+        Index(
+            "ix_messages_role_model_created", "role", "model_id", "created_at",
+            sqlite_where=text("role = 'assistant' AND model_id IS NOT NULL"),
+            postgresql_where=text("role = 'assistant' AND model_id IS NOT NULL"),
+        ),
+        # Responses to a user message (selecting the best response)
+        Index(
+            "ix_messages_parent_role", "parent_message_id", "role",
+            sqlite_where=text("role = 'assistant'"),
+            postgresql_where=text("role = 'assistant'"),
+        ),
+    )
+    __mapper_args__ = {"eager_defaults": True}
     
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=generate_uuid)
+    id: Mapped[str] = mapped_column(String(32), primary_key=True, default=generate_uuid)
     conversation_id: Mapped[str] = mapped_column(
-        String(36), ForeignKey("conversations.id", ondelete="CASCADE")
+        String(32), ForeignKey("conversations.id", ondelete="CASCADE")
     )
     
     # Message type: "user" for user input, "assistant" for model responses
@@ -76,10 +121,12 @@ class Message(Base):
     
     # Reference to the user message this response is for (for grouping)
     parent_message_id: Mapped[Optional[str]] = mapped_column(
-        String(36), ForeignKey("messages.id", ondelete="SET NULL"), nullable=True
+        String(32), ForeignKey("messages.id", ondelete="SET NULL"), nullable=True
     )
     
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=utcnow(), server_default=utcnow()
+    )
     
     # Relationships
     conversation: Mapped["Conversation"] = relationship("Conversation", back_populates="messages")
@@ -110,16 +157,21 @@ class MessageGroup(Base):
     """
     
     __tablename__ = "message_groups"
+    __table_args__ = (
+        Index("ix_msggrp_conv", "conversation_id"),
+    )
     
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=generate_uuid)
+    id: Mapped[str] = mapped_column(String(32), primary_key=True, default=generate_uuid)
     conversation_id: Mapped[str] = mapped_column(
-        String(36), ForeignKey("conversations.id", ondelete="CASCADE")
+        String(32), ForeignKey("conversations.id", ondelete="CASCADE")
     )
     user_message_id: Mapped[str] = mapped_column(
-        String(36), ForeignKey("messages.id", ondelete="CASCADE")
+        String(32), ForeignKey("messages.id", ondelete="CASCADE")
     )
     
     # Store which models were queried
     models_queried: Mapped[Optional[str]] = mapped_column(JSON, nullable=True)
     
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=utcnow(), server_default=utcnow()
+    )
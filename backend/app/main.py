@@ -8,6 +8,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.config import get_settings
 from app.db.database import init_db
 from app.routers import chat, history, usage
+from app.services.llm_service import llm_service
 
 settings = get_settings()
 
@@ -20,8 +21,12 @@ async def lifespan(app: FastAPI):
     await init_db()
     print("✅ Database initialized")
     
-    # Log available models
+    llm_service.open()
+    
+    # Log available models and keep them on app state for request handlers
     models = settings.enabled_models
+    app.state.model_list = models
+    app.state.models_available = len(models)
     if models:
         print(f"✅ Available models: {[m['name'] for m in models]}")
     else:
@@ -31,6 +36,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("👋 Shutting down LLM Council backend...")
+    await llm_service.aclose()
 
 
 app = FastAPI(
@@ -61,7 +67,7 @@ async def root():
     return {
         "status": "ok",
         "service": "llm-council",
-        "models_available": len(settings.enabled_models),
+        "models_available": app.state.models_available,
     }
 
 
@@ -4,18 +4,30 @@ import asyncio
 import json
 from typing import List, Dict, Any
 
+import orjson
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import get_db, async_session_maker
 from app.models.schemas import ModelInfo
-from app.services.llm_service import llm_service
+from app.services.llm_service import error_result, llm_service
 from app.services.history_service import history_service
+from app.services.model_registry import model_registry
 from app.config import get_settings
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 settings = get_settings()
 
+# Streamed tokens are sent once this many are buffered or this many
+# seconds have passed since the last frame, whichever comes first
+TOKEN_BATCH_SIZE = 8
+TOKEN_FLUSH_INTERVAL = 0.015
+
+
+async def _send_json(websocket: WebSocket, data: dict) -> None:
+    """Send a JSON text frame, encoded with orjson instead of the stdlib."""
+    await websocket.send_text(orjson.dumps(data).decode())
+
 
 @router.get("/models", response_model=List[ModelInfo])
 async def get_available_models():
@@ -32,14 +44,7 @@ async def get_grouped_models():
 
 def get_model_name(model_id: str) -> str:
     """Get display name for a model ID."""
-    # Try to get from registry first
-    from app.services.model_registry import model_registry
-    providers = model_registry.get_all_models(include_unavailable=True)
-    for provider in providers.values():
-        for model in provider.models:
-            if model.id == model_id:
-                return model.name
-    return model_id
+    return model_registry.get_model_name(model_id)
 
 
 @router.websocket("/ws")
@@ -72,14 +77,14 @@ async def websocket_chat(websocket: WebSocket):
             try:
                 request = json.loads(data)
             except json.JSONDecodeError:
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "error",
                     "message": "Invalid JSON"
                 })
                 continue
             
             if request.get("type") != "chat":
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "error",
                     "message": f"Unknown message type: {request.get('type')}"
                 })
@@ -91,7 +96,7 @@ async def websocket_chat(websocket: WebSocket):
             conversation_id = request.get("conversation_id")
             
             if not message:
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "error",
                     "message": "Message cannot be empty"
                 })
@@ -102,7 +107,7 @@ async def websocket_chat(websocket: WebSocket):
                 model_ids = [m["id"] for m in llm_service.get_available_models()]
             
             if not model_ids:
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "error",
                     "message": "No models available. Check API key configuration."
                 })
@@ -122,7 +127,7 @@ async def websocket_chat(websocket: WebSocket):
         pass  # Client disconnected, clean exit
     except Exception as e:
         try:
-            await websocket.send_json({
+            await _send_json(websocket, {
                 "type": "error",
                 "message": str(e)
             })
@@ -149,7 +154,7 @@ async def process_chat(
         conversation = await history_service.create_conversation(db)
     
     # Notify client of conversation ID
-    await websocket.send_json({
+    await _send_json(websocket, {
         "type": "conversation_started",
         "conversation_id": conversation.id,
     })
@@ -159,60 +164,75 @@ async def process_chat(
         db, conversation.id, message
     )
     
-    # Stream responses from all models in parallel
-    async def stream_model(model_id: str):
-        """Stream responses from a single model and save to DB."""
-        model_name = get_model_name(model_id)
-        
-        # Get conversation history with this model's own responses where available
-        previous_messages = await history_service.get_conversation_messages(
+    # Load each model's conversation history up front: the streaming tasks
+    # below run concurrently and must not share the session
+    contexts = {
+        model_id: await history_service.get_conversation_messages(
             db, conversation.id, for_model_id=model_id
         )
+        for model_id in model_ids
+    }
+    
+    # Final results in completion order, recorded before the client is
+    # notified so a dropped connection doesn't lose them
+    completed: List[dict] = []
+    
+    # Stream responses from all models in parallel
+    async def stream_model(model_id: str) -> None:
+        """Stream responses from a single model and record the final result."""
+        model_name = get_model_name(model_id)
         
-        # Add current message
-        messages = previous_messages + [{"role": "user", "content": message}]
+        # Add current message to this model's history
+        messages = contexts[model_id] + [{"role": "user", "content": message}]
         
-        full_content = ""
+        parts: List[str] = []
         final_result = None
         
+        # Tokens are coalesced into one frame per batch to cut per-token sends
+        loop = asyncio.get_running_loop()
+        pending: List[str] = []
+        last_flush = loop.time()
+        
         try:
             async for chunk in llm_service.stream_complete(model_id, messages):
                 if chunk["type"] == "token":
-                    full_content += chunk["token"]
-                    await websocket.send_json({
-                        "type": "token",
-                        "model_id": model_id,
-                        "token": chunk["token"],
-                    })
+                    parts.append(chunk["token"])
+                    pending.append(chunk["token"])
+                    now = loop.time()
+                    if (
+                        len(pending) >= TOKEN_BATCH_SIZE
+                        or now - last_flush >= TOKEN_FLUSH_INTERVAL
+                    ):
+                        await _send_json(websocket, {
+                            "type": "token",
+                            "model_id": model_id,
+                            "token": "".join(pending),
+                        })
+                        pending.clear()
+                        last_flush = now
                 elif chunk["type"] == "complete":
                     final_result = chunk
         except Exception as e:
-            final_result = {
+            final_result = error_result(
+                model_id, e, content="".join(parts) if parts else None
+            )
+        
+        if final_result:
+            final_result["model_name"] = model_name
+            completed.append(final_result)
+        
+        # Flush tokens still buffered, also when the stream failed part way.
+        # The result is already recorded, so a closed socket loses nothing.
+        if pending:
+            await _send_json(websocket, {
+                "type": "token",
                 "model_id": model_id,
-                "content": full_content if full_content else None,
-                "tokens_input": None,
-                "tokens_output": None,
-                "latency_ms": None,
-                "error": str(e),
-            }
+                "token": "".join(pending),
+            })
         
-        # Save assistant response to DB
         if final_result:
-            await history_service.add_assistant_message(
-                db=db,
-                conversation_id=conversation.id,
-                model_id=model_id,
-                model_name=model_name,
-                content=final_result.get("content"),
-                parent_message_id=user_message.id,
-                tokens_input=final_result.get("tokens_input"),
-                tokens_output=final_result.get("tokens_output"),
-                latency_ms=final_result.get("latency_ms"),
-                error=final_result.get("error"),
-            )
-            
             # Notify client that model is complete
-            await websocket.send_json({
+            await _send_json(websocket, {
                 "type": "model_complete",
                 "model_id": model_id,
                 "model_name": model_name,
@@ -221,14 +241,23 @@ async def process_chat(
                 "tokens_output": final_result.get("tokens_output"),
                 "latency_ms": final_result.get("latency_ms"),
                 "error": final_result.get("error"),
+                "error_code": final_result.get("error_code"),
             })
     
     # Run all model streams in parallel
     tasks = [stream_model(model_id) for model_id in model_ids]
     await asyncio.gather(*tasks, return_exceptions=True)
     
+    # Save all assistant responses to DB in a single transaction
+    await history_service.add_assistant_messages_bulk(
+        db,
+        conversation_id=conversation.id,
+        parent_message_id=user_message.id,
+        results=completed,
+    )
+    
     # Notify client that all models are complete
-    await websocket.send_json({
+    await _send_json(websocket, {
         "type": "chat_complete",
         "conversation_id": conversation.id,
         "user_message_id": user_message.id,
@@ -2,10 +2,9 @@
 
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, HTTPException
 
-from app.db.database import get_db
+from app.db.database import async_session_maker, engine
 from app.models.schemas import ConversationSummary, ConversationDetail, MessageOut
 from app.services.history_service import history_service
 
@@ -13,69 +12,38 @@ router = APIRouter(prefix="/history", tags=["history"])
 
 
 @router.get("", response_model=List[ConversationSummary])
-async def list_conversations(
-    limit: int = 50,
-    offset: int = 0,
-    db: AsyncSession = Depends(get_db),
-):
+async def list_conversations(limit: int = 50, offset: int = 0):
     """List all conversations, most recent first."""
-    conversations = await history_service.list_conversations(db, limit, offset)
+    async with engine.connect() as conn:
+        rows = await history_service.list_conversations(conn, limit, offset)
     
-    return [
-        ConversationSummary(
-            id=conv.id,
-            title=conv.title,
-            created_at=conv.created_at,
-            updated_at=conv.updated_at,
-            message_count=len(conv.messages) if conv.messages else 0,
-        )
-        for conv in conversations
-    ]
+    # Rows come straight from typed columns, so skip re-validation
+    return [ConversationSummary.model_construct(**row) for row in rows]
 
 
 @router.get("/{conversation_id}", response_model=ConversationDetail)
-async def get_conversation(
-    conversation_id: str,
-    db: AsyncSession = Depends(get_db),
-):
+async def get_conversation(conversation_id: str):
     """Get a specific conversation with all messages."""
-    conversation = await history_service.get_conversation(db, conversation_id)
+    async with engine.connect() as conn:
+        detail = await history_service.get_conversation_detail(
+            conn, conversation_id
+        )
     
-    if not conversation:
+    if not detail:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
+    conversation, messages = detail
     return ConversationDetail(
-        id=conversation.id,
-        title=conversation.title,
-        created_at=conversation.created_at,
-        updated_at=conversation.updated_at,
-        messages=[
-            MessageOut(
-                id=msg.id,
-                role=msg.role,
-                content=msg.content,
-                model_id=msg.model_id,
-                model_name=msg.model_name,
-                tokens_input=msg.tokens_input,
-                tokens_output=msg.tokens_output,
-                latency_ms=msg.latency_ms,
-                error=msg.error,
-                is_selected=msg.is_selected,
-                parent_message_id=msg.parent_message_id,
-                created_at=msg.created_at,
-            )
-            for msg in conversation.messages
-        ],
+        **conversation,
+        messages=[MessageOut.model_construct(**msg) for msg in messages],
     )
 
 
 @router.delete("/{conversation_id}")
-async def delete_conversation(
-    conversation_id: str,
-    db: AsyncSession = Depends(get_db),
-):
+async def delete_conversation(conversation_id: str):
     """Delete a conversation and all its messages."""
-    deleted = await history_service.delete_conversation(db, conversation_id)
+    async with async_session_maker() as db:
+        deleted = await history_service.delete_conversation(db, conversation_id)
     
     if not deleted:
         raise HTTPException(status_code=404, detail="Conversation not found")
@@ -84,29 +52,24 @@ async def delete_conversation(
 
 
 @router.patch("/{conversation_id}/title")
-async def update_title(
-    conversation_id: str,
-    title: str,
-    db: AsyncSession = Depends(get_db),
-):
+async def update_title(conversation_id: str, title: str):
     """Update conversation title."""
-    conversation = await history_service.update_conversation_title(
-        db, conversation_id, title
-    )
+    async with async_session_maker() as db:
+        new_title = await history_service.update_conversation_title(
+            db, conversation_id, title
+        )
     
-    if not conversation:
+    if new_title is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    return {"status": "updated", "title": conversation.title}
+    return {"status": "updated", "title": new_title}
 
 
 @router.post("/messages/{message_id}/select")
-async def select_best_response(
-    message_id: str,
-    db: AsyncSession = Depends(get_db),
-):
+async def select_best_response(message_id: str):
     """Mark a message as the selected/best response for its turn."""
-    message = await history_service.set_selected_response(db, message_id)
+    async with async_session_maker() as db:
+        message = await history_service.set_selected_response(db, message_id)
     
     if not message:
         raise HTTPException(
@@ -1,18 +1,82 @@
 """Usage statistics router for tracking API costs and token usage."""
 
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
-from fastapi import APIRouter, Query
-from sqlalchemy import func, select
+import orjson
+from fastapi import APIRouter, Query, Response
+from sqlalchemy import Float, String, column, func, select, values
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import async_session_maker
 from app.db.models import Message
+from app.services.history_service import history_service
 from app.services.llm_service import llm_service
 
 router = APIRouter(prefix="/usage", tags=["usage"])
 
+# Seconds a cached /usage response is served for, per period
+USAGE_CACHE_TTL = {"day": 30.0, "week": 300.0, "month": 300.0, "all": 300.0}
+
+# period -> (history_service.usage_version, expires_at, encoded response body)
+_usage_cache: Dict[str, Tuple[int, float, bytes]] = {}
+
+
+def _json_response(body: bytes) -> Response:
+    """Wrap an orjson-encoded body, skipping FastAPI's default JSON encoding."""
+    return Response(content=body, media_type="application/json")
+
+
+async def _pricing_cte(session: AsyncSession, start_date: Optional[datetime]):
+    """
+    Build a pricing(model_id, input_cost_per_million, output_cost_per_million) CTE.
+    
+    Covers every model that responded since start_date, priced from LiteLLM
+    whether or not its provider's API key is configured, so costs can be
+    summed in SQL.
+    """
+    stmt = (
+        select(Message.model_id)
+        .where(Message.role == "assistant")
+        .where(Message.model_id.isnot(None))
+        .distinct()
+    )
+    if start_date:
+        stmt = stmt.where(Message.created_at >= start_date)
+    model_ids = (await session.execute(stmt)).scalars().all()
+    
+    rows = []
+    for model_id in model_ids:
+        cost_info = llm_service.get_model_cost(model_id)
+        rows.append((
+            model_id,
+            cost_info["input_cost_per_million"] or 0.0,
+            cost_info["output_cost_per_million"] or 0.0,
+        ))
+    # VALUES needs at least one row
+    rows = rows or [("", 0.0, 0.0)]
+    
+    return values(
+        column("model_id", String),
+        column("input_cost_per_million", Float),
+        column("output_cost_per_million", Float),
+        name="pricing",
+    ).data(rows).cte("pricing")
+
+
+def _estimated_cost(pricing):
+    """SQL expression summing the estimated cost of the grouped messages."""
+    return (
+        func.sum(
+            func.coalesce(Message.tokens_input, 0)
+            * func.coalesce(pricing.c.input_cost_per_million, 0)
+            + func.coalesce(Message.tokens_output, 0)
+            * func.coalesce(pricing.c.output_cost_per_million, 0)
+        )
+        / 1_000_000
+    )
+
 
 @router.get("")
 async def get_usage_stats(
@@ -22,7 +86,24 @@ async def get_usage_stats(
     Get aggregated usage statistics for all models.
     
     Returns token counts and estimated costs per model for the specified period.
+    Responses are cached briefly and dropped as soon as new responses are stored.
     """
+    ttl = USAGE_CACHE_TTL.get(period)
+    if ttl is None:
+        return _json_response(orjson.dumps(await _compute_usage_stats(period)))
+    
+    version = history_service.usage_version
+    cached = _usage_cache.get(period)
+    if cached and cached[0] == version and cached[1] > time.monotonic():
+        return _json_response(cached[2])
+    
+    body = orjson.dumps(await _compute_usage_stats(period))
+    _usage_cache[period] = (version, time.monotonic() + ttl, body)
+    return _json_response(body)
+
+
+async def _compute_usage_stats(period: str) -> dict:
+    """Aggregate token counts and costs per model for a period."""
     async with async_session_maker() as session:
         # Calculate the date filter based on period
         now = datetime.utcnow()
@@ -35,7 +116,8 @@ async def get_usage_stats(
         else:  # all
             start_date = None
         
-        # Build query for aggregated stats per model using select()
+        # Build query for aggregated stats and cost per model using select()
+        pricing = await _pricing_cte(session, start_date)
         stmt = (
             select(
                 Message.model_id,
@@ -44,7 +126,11 @@ async def get_usage_stats(
                 func.sum(Message.tokens_output).label("total_output_tokens"),
                 func.count(Message.id).label("request_count"),
                 func.sum(Message.latency_ms).label("total_latency_ms"),
+                func.max(pricing.c.input_cost_per_million).label("input_cost_per_million"),
+                func.max(pricing.c.output_cost_per_million).label("output_cost_per_million"),
+                _estimated_cost(pricing).label("estimated_cost"),
             )
+            .outerjoin(pricing, pricing.c.model_id == Message.model_id)
             .where(Message.role == "assistant")
             .where(Message.model_id.isnot(None))
         )
@@ -57,7 +143,6 @@ async def get_usage_stats(
         result = await session.execute(stmt)
         rows = result.fetchall()
         
-        # Get cost info for each model
         model_stats = []
         total_cost = 0.0
         total_input_tokens = 0
@@ -70,16 +155,9 @@ async def get_usage_stats(
             output_tokens = row.total_output_tokens or 0
             request_count = row.request_count or 0
             total_latency = row.total_latency_ms or 0
-            
-            # Get pricing info
-            cost_info = llm_service.get_model_cost(model_id)
-            input_cost_per_m = cost_info.get("input_cost_per_million") or 0
-            output_cost_per_m = cost_info.get("output_cost_per_million") or 0
-            
-            # Calculate estimated cost
-            input_cost = (input_tokens / 1_000_000) * input_cost_per_m
-            output_cost = (output_tokens / 1_000_000) * output_cost_per_m
-            estimated_cost = input_cost + output_cost
+            input_cost_per_m = row.input_cost_per_million or 0
+            output_cost_per_m = row.output_cost_per_million or 0
+            estimated_cost = row.estimated_cost or 0.0
             
             total_cost += estimated_cost
             total_input_tokens += input_tokens
@@ -126,7 +204,8 @@ async def get_daily_usage(days: int = Query(7, ge=1, le=90)):
     async with async_session_maker() as session:
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        # Query daily aggregates using select()
+        # Query daily aggregates and costs using select()
+        pricing = await _pricing_cte(session, start_date)
         stmt = (
             select(
                 func.date(Message.created_at).label("date"),
@@ -134,7 +213,9 @@ async def get_daily_usage(days: int = Query(7, ge=1, le=90)):
                 func.sum(Message.tokens_input).label("input_tokens"),
                 func.sum(Message.tokens_output).label("output_tokens"),
                 func.count(Message.id).label("request_count"),
+                _estimated_cost(pricing).label("estimated_cost"),
             )
+            .outerjoin(pricing, pricing.c.model_id == Message.model_id)
             .where(Message.role == "assistant")
             .where(Message.model_id.isnot(None))
             .where(Message.created_at >= start_date)
@@ -149,8 +230,9 @@ async def get_daily_usage(days: int = Query(7, ge=1, le=90)):
         daily_data = {}
         for row in rows:
             date_str = str(row.date)
-            if date_str not in daily_data:
-                daily_data[date_str] = {
+            day = daily_data.get(date_str)
+            if day is None:
+                day = daily_data[date_str] = {
                     "date": date_str,
                     "total_tokens": 0,
                     "estimated_cost": 0.0,
@@ -160,14 +242,9 @@ async def get_daily_usage(days: int = Query(7, ge=1, le=90)):
             input_tokens = row.input_tokens or 0
             output_tokens = row.output_tokens or 0
             
-            # Get pricing
-            cost_info = llm_service.get_model_cost(row.model_id)
-            input_cost = (input_tokens / 1_000_000) * (cost_info.get("input_cost_per_million") or 0)
-            output_cost = (output_tokens / 1_000_000) * (cost_info.get("output_cost_per_million") or 0)
-            
-            daily_data[date_str]["total_tokens"] += input_tokens + output_tokens
-            daily_data[date_str]["estimated_cost"] += input_cost + output_cost
-            daily_data[date_str]["models"][row.model_id] = {
+            day["total_tokens"] += input_tokens + output_tokens
+            day["estimated_cost"] += row.estimated_cost or 0.0
+            day["models"][row.model_id] = {
                 "input_tokens": input_tokens,
                 "output_tokens": output_tokens,
                 "request_count": row.request_count,
@@ -177,7 +254,7 @@ async def get_daily_usage(days: int = Query(7, ge=1, le=90)):
         for day in daily_data.values():
             day["estimated_cost"] = round(day["estimated_cost"], 6)
         
-        return {
+        return _json_response(orjson.dumps({
             "days": days,
             "data": list(daily_data.values()),
-        }
+        }))
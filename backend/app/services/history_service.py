@@ -1,18 +1,84 @@
 """History service for conversation persistence."""
 
-from typing import List, Optional
-from datetime import datetime
+import textwrap
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, NamedTuple, Optional, Tuple
 
-from sqlalchemy import select, desc
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, delete, desc, func, insert, update
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 
-from app.db.models import Conversation, Message
+from app.db.models import Conversation, Message, utcnow
+
+# Number of conversations whose LLM context is kept in memory
+CONTEXT_CACHE_SIZE = 256
+
+# Max characters of a title derived from the first message (before "...")
+TITLE_MAX_CHARS = 50
+
+
+def _derive_title(content: str) -> str:
+    """Shorten a message to a title, cutting at a word boundary."""
+    title = textwrap.shorten(content, width=TITLE_MAX_CHARS + 3, placeholder="...")
+    if title == "...":
+        # The first word alone is too long: cut it instead
+        title = content[:TITLE_MAX_CHARS] + "..."
+    return title
+
+
+class _Response(NamedTuple):
+    """Assistant response fields needed to build LLM context."""
+    model_id: Optional[str]
+    content: Optional[str]
+    error: Optional[str]
+    is_selected: bool
+
+
+@dataclass
+class _Turn:
+    """A user message and the assistant responses to it."""
+    user_message_id: str
+    user_content: str
+    responses: List[_Response] = field(default_factory=list)
 
 
 class HistoryService:
     """Service for managing conversation history in the database."""
     
+    def __init__(self):
+        # conversation_id -> turns, in LRU order. Kept in sync by the write
+        # methods below so each chat turn can build LLM context without
+        # re-reading the whole conversation. Per-process only.
+        self._context_cache: "OrderedDict[str, List[_Turn]]" = OrderedDict()
+        # Bumped whenever assistant messages are added or deleted so
+        # cached usage statistics can tell they are out of date
+        self.usage_version = 0
+    
+    def _cache_turns(self, conversation_id: str, turns: List[_Turn]) -> None:
+        """Store turns for a conversation, evicting the least recently used."""
+        self._context_cache[conversation_id] = turns
+        self._context_cache.move_to_end(conversation_id)
+        while len(self._context_cache) > CONTEXT_CACHE_SIZE:
+            self._context_cache.popitem(last=False)
+    
+    def _cache_responses(
+        self,
+        conversation_id: str,
+        parent_message_id: Optional[str],
+        responses: List[_Response],
+    ) -> None:
+        """Attach new assistant responses to their turn in the cache."""
+        turns = self._context_cache.get(conversation_id)
+        if not turns:
+            return
+        for turn in reversed(turns):
+            if parent_message_id is None or turn.user_message_id == parent_message_id:
+                turn.responses.extend(responses)
+                return
+        # Unknown turn: drop the entry rather than serve stale context
+        del self._context_cache[conversation_id]
+    
     async def create_conversation(
         self,
         db: AsyncSession,
@@ -22,7 +88,7 @@ class HistoryService:
         conversation = Conversation(title=title)
         db.add(conversation)
         await db.commit()
-        await db.refresh(conversation)
+        self._cache_turns(conversation.id, [])
         return conversation
     
     async def get_conversation(
@@ -30,60 +96,110 @@ class HistoryService:
         db: AsyncSession,
         conversation_id: str,
     ) -> Optional[Conversation]:
-        """Get a conversation by ID with all messages."""
-        result = await db.execute(
-            select(Conversation)
-            .options(selectinload(Conversation.messages))
-            .where(Conversation.id == conversation_id)
-        )
-        return result.scalar_one_or_none()
+        """Get a conversation by ID (messages are not loaded)."""
+        return await db.get(Conversation, conversation_id)
     
     async def list_conversations(
         self,
-        db: AsyncSession,
+        conn: AsyncConnection,
         limit: int = 50,
         offset: int = 0,
-    ) -> List[Conversation]:
-        """List conversations ordered by most recent."""
-        result = await db.execute(
-            select(Conversation)
-            .options(selectinload(Conversation.messages))
+    ) -> List[RowMapping]:
+        """
+        List conversation summaries ordered by most recent.
+        Returns rows with id, title, created_at, updated_at and message_count.
+        """
+        result = await conn.execute(
+            select(
+                Conversation.id,
+                Conversation.title,
+                Conversation.created_at,
+                Conversation.updated_at,
+                func.count(Message.id).label("message_count"),
+            )
+            .outerjoin(Message, Message.conversation_id == Conversation.id)
+            .group_by(Conversation.id)
             .order_by(desc(Conversation.updated_at))
             .limit(limit)
             .offset(offset)
         )
-        return list(result.scalars().all())
+        return list(result.mappings())
+    
+    async def get_conversation_detail(
+        self,
+        conn: AsyncConnection,
+        conversation_id: str,
+    ) -> Optional[Tuple[RowMapping, List[RowMapping]]]:
+        """
+        Get a conversation row and its message rows (oldest first)
+        without loading ORM objects.
+        """
+        result = await conn.execute(
+            select(
+                Conversation.id,
+                Conversation.title,
+                Conversation.created_at,
+                Conversation.updated_at,
+            ).where(Conversation.id == conversation_id)
+        )
+        conversation = result.mappings().one_or_none()
+        if conversation is None:
+            return None
+        
+        result = await conn.execute(
+            select(
+                Message.id,
+                Message.role,
+                Message.content,
+                Message.model_id,
+                Message.model_name,
+                Message.tokens_input,
+                Message.tokens_output,
+                Message.latency_ms,
+                Message.error,
+                Message.is_selected,
+                Message.parent_message_id,
+                Message.created_at,
+            )
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at)
+        )
+        return conversation, list(result.mappings())
     
     async def delete_conversation(
         self,
         db: AsyncSession,
         conversation_id: str,
     ) -> bool:
-        """Delete a conversation and all its messages."""
-        conversation = await self.get_conversation(db, conversation_id)
-        if not conversation:
-            return False
+        """Delete a conversation and all its messages.
         
-        await db.delete(conversation)
+        Messages and message groups are removed by the database through
+        their ON DELETE CASCADE foreign keys.
+        """
+        result = await db.execute(
+            delete(Conversation).where(Conversation.id == conversation_id)
+        )
         await db.commit()
-        return True
+        self._context_cache.pop(conversation_id, None)
+        self.usage_version += 1
+        return result.rowcount > 0
     
     async def update_conversation_title(
         self,
         db: AsyncSession,
         conversation_id: str,
         title: str,
-    ) -> Optional[Conversation]:
-        """Update conversation title."""
-        conversation = await self.get_conversation(db, conversation_id)
-        if not conversation:
-            return None
-        
-        conversation.title = title
-        conversation.updated_at = datetime.utcnow()
+    ) -> Optional[str]:
+        """Update conversation title. Returns the new title, or None if not found."""
+        result = await db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(title=title, updated_at=utcnow())
+            .returning(Conversation.title)
+        )
+        new_title = result.scalar_one_or_none()
         await db.commit()
-        await db.refresh(conversation)
-        return conversation
+        return new_title
     
     async def add_user_message(
         self,
@@ -99,21 +215,22 @@ class HistoryService:
         )
         db.add(message)
         
-        # Update conversation timestamp
-        result = await db.execute(
-            select(Conversation).where(Conversation.id == conversation_id)
+        # Bump the conversation timestamp and, if no title is set yet,
+        # derive one from the message
+        derived_title = _derive_title(content)
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(
+                updated_at=utcnow(),
+                title=func.coalesce(func.nullif(Conversation.title, ""), derived_title),
+            )
         )
-        conversation = result.scalar_one_or_none()
-        if conversation:
-            conversation.updated_at = datetime.utcnow()
-            
-            # Auto-generate title from first message if not set
-            if not conversation.title:
-                # Use first 50 chars of message as title
-                conversation.title = content[:50] + ("..." if len(content) > 50 else "")
-        
         await db.commit()
-        await db.refresh(message)
+        
+        turns = self._context_cache.get(conversation_id)
+        if turns is not None:
+            turns.append(_Turn(message.id, content))
         return message
     
     async def add_assistant_message(
@@ -144,9 +261,57 @@ class HistoryService:
         )
         db.add(message)
         await db.commit()
-        await db.refresh(message)
+        self.usage_version += 1
+        self._cache_responses(
+            conversation_id,
+            parent_message_id,
+            [_Response(model_id, content, error, False)],
+        )
         return message
     
+    async def add_assistant_messages_bulk(
+        self,
+        db: AsyncSession,
+        conversation_id: str,
+        parent_message_id: Optional[str],
+        results: List[dict],
+    ) -> None:
+        """
+        Add the responses of all models for one turn in a single INSERT.
+        Each result dict carries model_id, model_name, content and metadata.
+        """
+        if not results:
+            return
+        
+        await db.execute(
+            insert(Message),
+            [
+                {
+                    "conversation_id": conversation_id,
+                    "role": "assistant",
+                    "content": result.get("content"),
+                    "model_id": result["model_id"],
+                    "model_name": result.get("model_name"),
+                    "parent_message_id": parent_message_id,
+                    "tokens_input": result.get("tokens_input"),
+                    "tokens_output": result.get("tokens_output"),
+                    "latency_ms": result.get("latency_ms"),
+                    "error": result.get("error"),
+                }
+                for result in results
+            ],
+        )
+        await db.commit()
+        self.usage_version += 1
+        self._cache_responses(
+            conversation_id,
+            parent_message_id,
+            [
+                _Response(result["model_id"], result.get("content"), result.get("error"), False)
+                for result in results
+            ],
+        )
+    
     async def get_conversation_messages(
         self,
         db: AsyncSession,
@@ -160,44 +325,69 @@ class HistoryService:
         If for_model_id is provided, uses that model's own responses where available.
         Falls back to: 1) selected/best response, 2) first successful response.
         """
-        conversation = await self.get_conversation(db, conversation_id)
-        if not conversation:
-            return []
+        turns = self._context_cache.get(conversation_id)
+        if turns is None:
+            turns = await self._load_turns(db, conversation_id)
+            if turns is None:
+                return []
+            self._cache_turns(conversation_id, turns)
+        else:
+            self._context_cache.move_to_end(conversation_id)
         
-        # Group messages by user message (turn)
         context = []
-        current_user_msg = None
-        responses_for_turn: List[Message] = []
-        
-        for msg in conversation.messages:
-            if msg.role == "user":
-                # Process previous turn's responses before starting new turn
-                if current_user_msg and responses_for_turn:
-                    context.append({"role": "user", "content": current_user_msg.content})
-                    best_response = self._select_best_response(responses_for_turn, for_model_id)
-                    if best_response:
-                        context.append({"role": "assistant", "content": best_response.content})
-                
-                # Start new turn
-                current_user_msg = msg
-                responses_for_turn = []
-            elif msg.role == "assistant":
-                responses_for_turn.append(msg)
-        
-        # Process final turn
-        if current_user_msg and responses_for_turn:
-            context.append({"role": "user", "content": current_user_msg.content})
-            best_response = self._select_best_response(responses_for_turn, for_model_id)
+        for turn in turns:
+            # Turns still waiting for responses are not part of the context
+            if not turn.responses:
+                continue
+            context.append({"role": "user", "content": turn.user_content})
+            best_response = self._select_best_response(turn.responses, for_model_id)
             if best_response:
                 context.append({"role": "assistant", "content": best_response.content})
         
         return context
     
+    async def _load_turns(
+        self,
+        db: AsyncSession,
+        conversation_id: str,
+    ) -> Optional[List[_Turn]]:
+        """
+        Group a conversation's messages into turns (user message + responses).
+        Only the columns needed for LLM context are read.
+        Returns None if the conversation has no messages.
+        """
+        result = await db.execute(
+            select(
+                Message.id,
+                Message.role,
+                Message.content,
+                Message.model_id,
+                Message.error,
+                Message.is_selected,
+            )
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at)
+        )
+        rows = result.all()
+        if not rows:
+            return None
+        
+        turns: List[_Turn] = []
+        for msg_id, role, content, model_id, error, is_selected in rows:
+            if role == "user":
+                turns.append(_Turn(msg_id, content))
+            elif role == "assistant" and turns:
+                turns[-1].responses.append(
+                    _Response(model_id, content, error, is_selected)
+                )
+        
+        return turns
+    
     def _select_best_response(
         self,
-        responses: List[Message],
+        responses: List[_Response],
         for_model_id: Optional[str] = None,
-    ) -> Optional[Message]:
+    ) -> Optional[_Response]:
         """
         Select the best response for a turn.
         Priority:
@@ -233,30 +423,27 @@ class HistoryService:
         Clears is_selected from other responses to the same parent message.
         """
         # Get the message
-        result = await db.execute(
-            select(Message).where(Message.id == message_id)
-        )
-        message = result.scalar_one_or_none()
+        message = await db.get(Message, message_id)
         if not message or message.role != "assistant":
             return None
         
-        # Find all sibling responses (same parent_message_id)
+        # Select it and clear all sibling responses (same parent_message_id)
         if message.parent_message_id:
-            result = await db.execute(
-                select(Message).where(
+            await db.execute(
+                update(Message)
+                .where(
                     Message.parent_message_id == message.parent_message_id,
-                    Message.role == "assistant"
+                    Message.role == "assistant",
                 )
+                .values(is_selected=(Message.id == message_id))
             )
-            siblings = list(result.scalars().all())
-            for sibling in siblings:
-                sibling.is_selected = (sibling.id == message_id)
         else:
             # Fallback: just set this one
             message.is_selected = True
         
         await db.commit()
-        await db.refresh(message)
+        # Selection changes which response other models see as context
+        self._context_cache.pop(message.conversation_id, None)
         return message
 
 
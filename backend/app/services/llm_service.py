@@ -2,8 +2,11 @@
 
 import asyncio
 import time
-from typing import AsyncGenerator, List, Optional, Dict, Any
+from functools import lru_cache
+from typing import AsyncGenerator, List, Optional, Dict, Any, Tuple
 
+import aiohttp
+import httpx
 import litellm
 from litellm import acompletion, model_cost
 
@@ -15,37 +18,156 @@ settings = get_settings()
 litellm.set_verbose = settings.debug
 litellm.drop_params = True  # Drop unsupported params (e.g., temperature for gpt-5)
 
+# Max chunks buffered by stream_parallel before producers wait for the consumer
+STREAM_QUEUE_SIZE = 256
+
+# Max characters of an exception message kept in results (LiteLLM errors can
+# embed whole request/response bodies)
+ERROR_MESSAGE_MAX_CHARS = 512
+
+# Exception type -> error code, most specific first
+_ERROR_CODES = (
+    (litellm.exceptions.RateLimitError, "rate_limit"),
+    (litellm.exceptions.AuthenticationError, "auth"),
+    (litellm.exceptions.PermissionDeniedError, "permission_denied"),
+    (litellm.exceptions.Timeout, "timeout"),
+    (litellm.exceptions.ContextWindowExceededError, "context_window"),
+    (litellm.exceptions.ContentPolicyViolationError, "content_policy"),
+    (litellm.exceptions.BadRequestError, "bad_request"),
+    (litellm.exceptions.NotFoundError, "not_found"),
+    (litellm.exceptions.APIConnectionError, "connection"),
+    (litellm.exceptions.ServiceUnavailableError, "unavailable"),
+    (litellm.exceptions.InternalServerError, "provider_error"),
+)
+
+
+def classify_error(e: BaseException) -> Tuple[str, str]:
+    """Return (error_code, truncated message) for an exception."""
+    for exc_type, code in _ERROR_CODES:
+        if isinstance(e, exc_type):
+            break
+    else:
+        code = "unknown"
+    return code, str(e)[:ERROR_MESSAGE_MAX_CHARS]
+
+
+def error_result(
+    model_id: str,
+    exc: BaseException,
+    latency_ms: Optional[int] = None,
+    content: Optional[str] = None,
+) -> dict:
+    """Build the result dict for a request that failed with exc."""
+    error_code, error = classify_error(exc)
+    return {
+        "model_id": model_id,
+        "content": content,
+        "tokens_input": None,
+        "tokens_output": None,
+        "latency_ms": latency_ms,
+        "error": error,
+        "error_code": error_code,
+    }
+
+
+@lru_cache(maxsize=256)
+def _model_cost_per_million(model_id: str) -> Tuple[Optional[float], Optional[float]]:
+    """Look up (input, output) cost per million tokens; pricing is static at runtime."""
+    # LiteLLM model_cost is a dict with model names as keys
+    # Try exact match first, then try without provider prefix
+    cost_info = model_cost.get(model_id)
+    
+    if not cost_info:
+        # Try without provider prefix (e.g., "gpt-4o" instead of "openai/gpt-4o")
+        model_name = model_id.split("/")[-1] if "/" in model_id else model_id
+        cost_info = model_cost.get(model_name)
+    
+    if not isinstance(cost_info, dict):
+        return None, None
+    
+    # Prices may be present but null
+    input_cost = (cost_info.get("input_cost_per_token") or 0) * 1_000_000
+    output_cost = (cost_info.get("output_cost_per_token") or 0) * 1_000_000
+    
+    return (
+        round(input_cost, 4) if input_cost else None,
+        round(output_cost, 4) if output_cost else None,
+    )
+
 
 class LLMService:
     """Service for making LLM API calls via LiteLLM."""
     
     def __init__(self):
         self.settings = get_settings()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
+        # provider -> semaphore bounding concurrent requests to it
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+    
+    def open(self) -> None:
+        """
+        Create the pooled HTTP client shared by all LiteLLM calls.
+        
+        Keeps provider connections (and their TLS sessions) alive across
+        requests and models instead of reconnecting per call.
+        """
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=litellm.request_timeout,
+                limits=httpx.Limits(max_connections=200, max_keepalive_connections=64),
+            )
+            litellm.aclient_session = self._client
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Get the aiohttp session shared by all LiteLLM calls, creating it on
+        first use. LiteLLM's own provider handlers use it via shared_session.
+        """
+        if self._session is None or self._session.closed:
+            async with self._session_lock:
+                if self._session is None or self._session.closed:
+                    self._session = aiohttp.ClientSession(
+                        connector=aiohttp.TCPConnector(
+                            limit=100, limit_per_host=20, keepalive_timeout=75
+                        )
+                    )
+        return self._session
+    
+    async def aclose(self) -> None:
+        """Close the shared HTTP client and session."""
+        if self._client is not None:
+            litellm.aclient_session = None
+            await self._client.aclose()
+            self._client = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    def _get_semaphore(self, model_id: str) -> asyncio.Semaphore:
+        """Get the semaphore limiting concurrent requests to a model's provider."""
+        provider = model_cost.get(model_id, {}).get("litellm_provider") or model_id.split("/")[0]
+        semaphore = self._semaphores.get(provider)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.settings.provider_max_concurrency)
+            self._semaphores[provider] = semaphore
+        return semaphore
     
     def get_model_cost(self, model_id: str) -> dict:
         """Get cost information for a model from LiteLLM."""
-        try:
-            # LiteLLM model_cost is a dict with model names as keys
-            # Try exact match first, then try without provider prefix
-            cost_info = model_cost.get(model_id, {})
-            
-            if not cost_info:
-                # Try without provider prefix (e.g., "gpt-4o" instead of "openai/gpt-4o")
-                model_name = model_id.split("/")[-1] if "/" in model_id else model_id
-                cost_info = model_cost.get(model_name, {})
-            
-            input_cost = cost_info.get("input_cost_per_token", 0) * 1_000_000
-            output_cost = cost_info.get("output_cost_per_token", 0) * 1_000_000
-            
-            return {
-                "input_cost_per_million": round(input_cost, 4) if input_cost else None,
-                "output_cost_per_million": round(output_cost, 4) if output_cost else None,
-            }
-        except Exception:
-            return {"input_cost_per_million": None, "output_cost_per_million": None}
+        input_cost, output_cost = _model_cost_per_million(model_id)
+        return {
+            "input_cost_per_million": input_cost,
+            "output_cost_per_million": output_cost,
+        }
     
     def get_available_models(self) -> List[dict]:
-        """Get list of available models based on configured API keys."""
+        """
+        Get list of available models based on configured API keys.
+        The dicts are shared with the model registry and must not be modified.
+        """
         # Use model registry for dynamic model discovery
         from app.services.model_registry import model_registry
         models = model_registry.get_available_models()
@@ -74,7 +196,18 @@ class LLMService:
         
         Returns dict with response content and metadata.
         """
-        start_time = time.time()
+        async with self._get_semaphore(model_id):
+            return await self._complete(model_id, messages, temperature, max_tokens)
+    
+    async def _complete(
+        self,
+        model_id: str,
+        messages: List[dict],
+        temperature: float,
+        max_tokens: Optional[int],
+    ) -> dict:
+        """Make a completion request without concurrency limiting."""
+        start_ns = time.perf_counter_ns()
         
         try:
             response = await acompletion(
@@ -82,9 +215,10 @@ class LLMService:
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
+                shared_session=await self._get_session(),
             )
             
-            latency_ms = int((time.time() - start_time) * 1000)
+            latency_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             
             return {
                 "model_id": model_id,
@@ -93,17 +227,31 @@ class LLMService:
                 "tokens_output": response.usage.completion_tokens if response.usage else None,
                 "latency_ms": latency_ms,
                 "error": None,
+                "error_code": None,
             }
         except Exception as e:
-            latency_ms = int((time.time() - start_time) * 1000)
-            return {
-                "model_id": model_id,
-                "content": None,
-                "tokens_input": None,
-                "tokens_output": None,
-                "latency_ms": latency_ms,
-                "error": str(e),
-            }
+            latency_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+            return error_result(model_id, e, latency_ms)
+    
+    def _start_completions(
+        self,
+        model_ids: List[str],
+        messages: List[dict],
+        temperature: float,
+        max_tokens: Optional[int],
+        max_concurrency: int,
+    ) -> List[asyncio.Task]:
+        """
+        Start one complete() task per model, in model_ids order.
+        At most max_concurrency requests are in flight at once.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run(model_id: str) -> dict:
+            async with semaphore:
+                return await self.complete(model_id, messages, temperature, max_tokens)
+        
+        return [asyncio.create_task(run(model_id)) for model_id in model_ids]
     
     async def complete_parallel(
         self,
@@ -111,35 +259,44 @@ class LLMService:
         messages: List[dict],
         temperature: float = 0.7,
         max_tokens: Optional[int] = None,
+        max_concurrency: int = 16,
     ) -> List[dict]:
         """
         Make parallel completion requests to multiple models.
         
-        Returns list of response dicts from all models.
+        At most max_concurrency requests are in flight at once.
+        Returns list of response dicts from all models, in model_ids order.
         """
-        tasks = [
-            self.complete(model_id, messages, temperature, max_tokens)
-            for model_id in model_ids
-        ]
-        
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Handle any exceptions that weren't caught
-        processed_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                processed_results.append({
-                    "model_id": model_ids[i],
-                    "content": None,
-                    "tokens_input": None,
-                    "tokens_output": None,
-                    "latency_ms": None,
-                    "error": str(result),
-                })
-            else:
-                processed_results.append(result)
+        tasks = self._start_completions(
+            model_ids, messages, temperature, max_tokens, max_concurrency
+        )
+        # complete() turns failures into error results, so nothing raises here
+        return await asyncio.gather(*tasks)
+    
+    async def complete_parallel_iter(
+        self,
+        model_ids: List[str],
+        messages: List[dict],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        max_concurrency: int = 16,
+    ) -> AsyncGenerator[dict, None]:
+        """
+        Make parallel completion requests to multiple models.
         
-        return processed_results
+        Yields each model's response dict as soon as it finishes (completion
+        order, not model_ids order), so callers can act on fast models first.
+        """
+        tasks = self._start_completions(
+            model_ids, messages, temperature, max_tokens, max_concurrency
+        )
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # Stop outstanding requests if the consumer goes away early
+            for task in tasks:
+                task.cancel()
     
     async def stream_complete(
         self,
@@ -153,8 +310,22 @@ class LLMService:
         
         Yields dicts with either token chunks or final metadata.
         """
-        start_time = time.time()
-        full_content = ""
+        async with self._get_semaphore(model_id):
+            async for chunk in self._stream_complete(
+                model_id, messages, temperature, max_tokens
+            ):
+                yield chunk
+    
+    async def _stream_complete(
+        self,
+        model_id: str,
+        messages: List[dict],
+        temperature: float,
+        max_tokens: Optional[int],
+    ) -> AsyncGenerator[dict, None]:
+        """Stream a completion without concurrency limiting."""
+        start_ns = time.perf_counter_ns()
+        parts: List[str] = []
         tokens_input = None
         tokens_output = None
         
@@ -165,12 +336,13 @@ class LLMService:
                 temperature=temperature,
                 max_tokens=max_tokens,
                 stream=True,
+                shared_session=await self._get_session(),
             )
             
             async for chunk in response:
                 if chunk.choices and chunk.choices[0].delta.content:
                     token = chunk.choices[0].delta.content
-                    full_content += token
+                    parts.append(token)
                     yield {
                         "type": "token",
                         "model_id": model_id,
@@ -182,29 +354,65 @@ class LLMService:
                     tokens_input = chunk.usage.prompt_tokens
                     tokens_output = chunk.usage.completion_tokens
             
-            latency_ms = int((time.time() - start_time) * 1000)
+            latency_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             
             yield {
                 "type": "complete",
                 "model_id": model_id,
-                "content": full_content,
+                "content": "".join(parts),
                 "tokens_input": tokens_input,
                 "tokens_output": tokens_output,
                 "latency_ms": latency_ms,
                 "error": None,
+                "error_code": None,
             }
-            
+        
         except Exception as e:
-            latency_ms = int((time.time() - start_time) * 1000)
+            latency_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
             yield {
                 "type": "complete",
-                "model_id": model_id,
-                "content": full_content if full_content else None,
-                "tokens_input": None,
-                "tokens_output": None,
-                "latency_ms": latency_ms,
-                "error": str(e),
+                **error_result(
+                    model_id, e, latency_ms, "".join(parts) if parts else None
+                ),
             }
+    
+    async def stream_parallel(
+        self,
+        model_ids: List[str],
+        messages: List[dict],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+    ) -> AsyncGenerator[dict, None]:
+        """
+        Stream completions from multiple models concurrently.
+        
+        Yields the chunks of all models interleaved as they arrive (same shape
+        as stream_complete), including one "complete" chunk per model.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        
+        async def pump(model_id: str) -> None:
+            """Forward one model's stream into the shared queue."""
+            try:
+                async for chunk in self.stream_complete(
+                    model_id, messages, temperature, max_tokens
+                ):
+                    await queue.put(chunk)
+            except Exception as e:
+                await queue.put({"type": "complete", **error_result(model_id, e)})
+        
+        tasks = [asyncio.create_task(pump(model_id)) for model_id in model_ids]
+        remaining = len(tasks)
+        try:
+            while remaining:
+                chunk = await queue.get()
+                if chunk["type"] == "complete":
+                    remaining -= 1
+                yield chunk
+        finally:
+            # Stop producers if the consumer goes away early
+            for task in tasks:
+                task.cancel()
 
 
 # Singleton instance
@@ -1,6 +1,6 @@
 """Model registry service for dynamic model discovery from LiteLLM."""
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 from functools import lru_cache
 import re
@@ -10,9 +10,9 @@ from litellm import model_cost
 from app.config import get_settings
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ModelInfo:
-    """Information about a single model."""
+    """Information about a single model (immutable once built)."""
     id: str
     name: str
     provider: str
@@ -25,9 +25,12 @@ class ModelInfo:
     supports_streaming: bool = True
     is_featured: bool = False
     has_api_key: bool = False
+    _dict: dict = field(init=False, repr=False, compare=False)
     
-    def to_dict(self) -> dict:
-        return {
+    def __post_init__(self):
+        # Serialized once; the registry hands out the same instances on
+        # every /models request
+        object.__setattr__(self, "_dict", {
             "id": self.id,
             "name": self.name,
             "provider": self.provider,
@@ -40,24 +43,35 @@ class ModelInfo:
             "supports_streaming": self.supports_streaming,
             "is_featured": self.is_featured,
             "has_api_key": self.has_api_key,
-        }
+        })
+    
+    def to_dict(self) -> dict:
+        """Return the serialized model (shared; must not be modified)."""
+        return self._dict
 
 
-@dataclass
+@dataclass(slots=True)
 class ProviderInfo:
     """Information about a provider and its models."""
     id: str
     name: str
     has_api_key: bool = False
     models: List[ModelInfo] = field(default_factory=list)
+    _dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
     
     def to_dict(self) -> dict:
-        return {
-            "id": self.id,
-            "name": self.name,
-            "has_api_key": self.has_api_key,
-            "models": [m.to_dict() for m in self.models],
-        }
+        """
+        Return the serialized provider (shared; must not be modified).
+        Built on first call, once the registry has added all models.
+        """
+        if self._dict is None:
+            self._dict = {
+                "id": self.id,
+                "name": self.name,
+                "has_api_key": self.has_api_key,
+                "models": [m.to_dict() for m in self.models],
+            }
+        return self._dict
 
 
 # Provider display names and required env vars
@@ -139,6 +153,24 @@ PROVIDER_CONFIG = {
     },
 }
 
+# Date suffix (YYYYMMDD format)
+_DATE_SUFFIX_RE = re.compile(r'(\d{8})$')
+
+# Version number patterns, in priority order: the first one found anywhere
+# in the name wins. Each is a lookahead from the start of the name so a
+# single match() tries them in turn.
+# Handle patterns like: gpt-4, claude-3-5, gemini-2.0, o1, o3
+_VERSION_RE = re.compile(
+    r'^(?:'
+    r'(?=.*?[- ](?P<major>\d+)[- .](?P<minor>\d+))'  # e.g., 3-5, 2.0
+    r'|(?=.*?[- ](?P<major2>\d+)(?:[- ]|$))'          # e.g., -4, -3
+    r'|(?=o(?P<major3>\d+))'                          # e.g., o1, o3
+    r'|(?=.*?(?P<major4>\d+)$)'                       # trailing number
+    r')'
+)
+
+
+@lru_cache(maxsize=2048)
 def _extract_model_sort_key(model_id: str) -> tuple:
     """
     Extract sorting key for models - prioritizes by:
@@ -146,33 +178,22 @@ def _extract_model_sort_key(model_id: str) -> tuple:
     2. Version number (higher first) - e.g., 4 > 3.5 > 3
     3. Name alphabetically
     """
-    import re
-    
     base_name = model_id.split("/")[-1] if "/" in model_id else model_id
     
     # Extract date suffix (YYYYMMDD format)
-    date_match = re.search(r'(\d{8})$', base_name)
+    date_match = _DATE_SUFFIX_RE.search(base_name)
     date_val = int(date_match.group(1)) if date_match else 0
     
     # Extract version numbers
-    # Handle patterns like: gpt-4, claude-3-5, gemini-2.0, o1, o3
-    version_patterns = [
-        r'[- ](\d+)[- .](\d+)',  # e.g., 3-5, 2.0
-        r'[- ](\d+)(?:[- ]|$)',   # e.g., -4, -3
-        r'^o(\d+)',               # e.g., o1, o3
-        r'(\d+)$',                # trailing number
-    ]
-    
     major_version = 0
     minor_version = 0
     
-    for pattern in version_patterns:
-        match = re.search(pattern, base_name.lower())
-        if match:
-            major_version = int(match.group(1))
-            if len(match.groups()) > 1 and match.group(2):
-                minor_version = int(match.group(2))
-            break
+    match = _VERSION_RE.match(base_name.lower())
+    if match:
+        major, minor, major2, major3, major4 = match.groups()
+        major_version = int(major or major2 or major3 or major4)
+        if minor:
+            minor_version = int(minor)
     
     # Return tuple for sorting: higher date first, higher version first, then alpha
     return (-date_val, -major_version, -minor_version, base_name.lower())
@@ -206,49 +227,86 @@ MODEL_DESCRIPTIONS = {
 }
 
 
+# Name cleanup patterns for _generate_model_name
+_DATE_SUFFIX_SEP_RE = re.compile(r'-\d{8}$')
+_SEPARATOR_TABLE = str.maketrans('-_', '  ')
+
+
+@lru_cache(maxsize=2048)
 def _generate_model_name(model_id: str) -> str:
     """Generate a human-readable name from model ID."""
     # Remove provider prefix if present
     name = model_id.split("/")[-1] if "/" in model_id else model_id
     
     # Clean up common patterns
-    name = re.sub(r'-\d{8}$', '', name)  # Remove date suffixes like -20241022
-    name = re.sub(r'[-_]', ' ', name)
+    name = _DATE_SUFFIX_SEP_RE.sub('', name)  # Remove date suffixes like -20241022
+    name = name.translate(_SEPARATOR_TABLE)
     name = name.title()
     
-    # Fix common capitalizations
-    replacements = {
-        'Gpt': 'GPT',
-        'Gpt 4': 'GPT-4',
-        'Gpt 3': 'GPT-3',
-        'Gpt 4o': 'GPT-4o',
-        'Gpt 4 ': 'GPT-4 ',
-        'Claude ': 'Claude ',
-        'Gemini': 'Gemini',
-        'Llama': 'Llama',
-        'Mistral': 'Mistral',
-        'Mixtral': 'Mixtral',
-        'Grok': 'Grok',
-        ' Mini': ' Mini',
-        ' Pro': ' Pro',
-        ' Ultra': ' Ultra',
-        ' Flash': ' Flash',
-        ' Haiku': ' Haiku',
-        ' Sonnet': ' Sonnet',
-        ' Opus': ' Opus',
-    }
-    for old, new in replacements.items():
-        name = name.replace(old, new)
+    # Fix common capitalizations (title() turns "gpt" into "Gpt")
+    name = name.replace('Gpt', 'GPT')
     
     return name
 
 
+def _index_chat_models() -> Dict[str, List[Tuple[str, dict]]]:
+    """Group LiteLLM's chat models by supported provider, keeping map order."""
+    index: Dict[str, List[Tuple[str, dict]]] = {}
+    for model_id, info in model_cost.items():
+        if not isinstance(info, dict):
+            continue
+        
+        # Only include chat models
+        if info.get("mode", "") != "chat":
+            continue
+        
+        # Skip providers we don't support or configure
+        provider_id = info.get("litellm_provider", "unknown")
+        if provider_id not in PROVIDER_CONFIG:
+            continue
+        
+        index.setdefault(provider_id, []).append((model_id, info))
+    return index
+
+
+# provider_id -> [(model_id, info)], built once since model_cost is static
+_CHAT_MODELS_BY_PROVIDER = _index_chat_models()
+
+
+def _describe_chat_models() -> Dict[str, str]:
+    """Resolve the description of each indexed chat model that has one."""
+    descriptions: Dict[str, str] = {}
+    for entries in _CHAT_MODELS_BY_PROVIDER.values():
+        for model_id, _ in entries:
+            description = MODEL_DESCRIPTIONS.get(model_id, "")
+            if not description:
+                # Check without provider prefix
+                base_name = model_id.split("/")[-1] if "/" in model_id else model_id
+                description = MODEL_DESCRIPTIONS.get(base_name, "")
+            if description:
+                descriptions[model_id] = description
+    return descriptions
+
+
+# model_id -> description, so building the registry is a single lookup per model
+_DESCRIPTIONS_BY_ID = _describe_chat_models()
+
+
 class ModelRegistry:
     """Registry for discovering and organizing models from LiteLLM."""
     
     def __init__(self):
         self.settings = get_settings()
-        self._models_cache: Optional[Dict[str, ProviderInfo]] = None
+        # include_unavailable -> providers; inputs are static per process
+        self._models_cache: Dict[bool, Dict[str, ProviderInfo]] = {}
+        self._available_cache: Optional[List[ModelInfo]] = None
+        self._name_index: Optional[Dict[str, str]] = None
+    
+    def invalidate(self) -> None:
+        """Drop cached models (e.g. after API key settings change)."""
+        self._models_cache.clear()
+        self._available_cache = None
+        self._name_index = None
     
     def _has_api_key(self, provider: str) -> bool:
         """Check if we have an API key for the given provider."""
@@ -268,79 +326,77 @@ class ModelRegistry:
         
         Args:
             include_unavailable: If True, includes models without API keys
+        
+        Results are cached; the returned objects are shared and must not be
+        modified.
         """
+        cached = self._models_cache.get(include_unavailable)
+        if cached is not None:
+            return cached
+        
+        full = self._models_cache.get(True)
+        if not include_unavailable and full is not None:
+            # Already built with every provider: keep the ones with keys
+            providers = {pid: p for pid, p in full.items() if p.has_api_key}
+            self._models_cache[False] = providers
+            return providers
+        
         providers: Dict[str, ProviderInfo] = {}
         
-        for model_id, info in model_cost.items():
-            if not isinstance(info, dict):
-                continue
-            
-            # Only include chat models
-            mode = info.get("mode", "")
-            if mode != "chat":
-                continue
-            
-            provider_id = info.get("litellm_provider", "unknown")
-            
-            # Skip providers we don't support or configure
-            if provider_id not in PROVIDER_CONFIG:
-                continue
-            
-            has_key = self._has_api_key(provider_id)
+        # Per-provider lookups done once instead of per model
+        api_key_map = {pid: self._has_api_key(pid) for pid in PROVIDER_CONFIG}
+        name_map = {pid: self._get_provider_name(pid) for pid in PROVIDER_CONFIG}
+        
+        for provider_id, entries in _CHAT_MODELS_BY_PROVIDER.items():
+            has_key = api_key_map[provider_id]
             
             # Skip unavailable if not requested
             if not include_unavailable and not has_key:
                 continue
             
-            # Create provider if not exists
-            if provider_id not in providers:
-                providers[provider_id] = ProviderInfo(
-                    id=provider_id,
-                    name=self._get_provider_name(provider_id),
-                    has_api_key=has_key,
-                )
-            
-            # Calculate costs
-            input_cost = info.get("input_cost_per_token", 0) * 1_000_000
-            output_cost = info.get("output_cost_per_token", 0) * 1_000_000
-            
-            # Get description
-            description = MODEL_DESCRIPTIONS.get(model_id, "")
-            if not description:
-                # Check without provider prefix
-                base_name = model_id.split("/")[-1] if "/" in model_id else model_id
-                description = MODEL_DESCRIPTIONS.get(base_name, "")
-            
-            model = ModelInfo(
-                id=model_id,
-                name=_generate_model_name(model_id),
-                provider=provider_id,
-                description=description,
-                input_cost_per_million=round(input_cost, 4) if input_cost else None,
-                output_cost_per_million=round(output_cost, 4) if output_cost else None,
-                max_tokens=info.get("max_output_tokens") or info.get("max_tokens"),
-                supports_vision=info.get("supports_vision", False),
-                supports_tools=info.get("supports_function_calling", False),
-                supports_streaming=True,  # Most models support streaming
-                is_featured=False,  # No longer used, sorting by date/version instead
+            provider = providers[provider_id] = ProviderInfo(
+                id=provider_id,
+                name=name_map[provider_id],
                 has_api_key=has_key,
             )
             
-            providers[provider_id].models.append(model)
+            for model_id, info in entries:
+                # Calculate costs
+                input_cost = info.get("input_cost_per_token", 0) * 1_000_000
+                output_cost = info.get("output_cost_per_token", 0) * 1_000_000
+                
+                model = ModelInfo(
+                    id=model_id,
+                    name=_generate_model_name(model_id),
+                    provider=provider_id,
+                    description=_DESCRIPTIONS_BY_ID.get(model_id, ""),
+                    input_cost_per_million=round(input_cost, 4) if input_cost else None,
+                    output_cost_per_million=round(output_cost, 4) if output_cost else None,
+                    max_tokens=info.get("max_output_tokens") or info.get("max_tokens"),
+                    supports_vision=info.get("supports_vision", False),
+                    supports_tools=info.get("supports_function_calling", False),
+                    supports_streaming=True,  # Most models support streaming
+                    is_featured=False,  # No longer used, sorting by date/version instead
+                    has_api_key=has_key,
+                )
+                
+                provider.models.append(model)
         
         # Sort models within each provider (newest first based on date/version)
         for provider in providers.values():
             provider.models.sort(key=lambda m: _extract_model_sort_key(m.id))
-        
+        self._models_cache[include_unavailable] = providers
         return providers
     
     def get_available_models(self) -> List[ModelInfo]:
-        """Get flat list of models that have API keys configured."""
-        providers = self.get_all_models(include_unavailable=False)
-        models = []
-        for provider in providers.values():
-            models.extend(provider.models)
-        return models
+        """Get flat list of models that have API keys configured (cached)."""
+        if self._available_cache is None:
+            providers = self.get_all_models(include_unavailable=False)
+            models = []
+            for provider in providers.values():
+                models.extend(provider.models)
+            self._available_cache = models
+        return self._available_cache
     
     def get_featured_models(self) -> List[ModelInfo]:
         """Get newest/top models that have API keys configured (first 3 per provider)."""
@@ -350,6 +406,21 @@ class ModelRegistry:
             # Take first 3 models from each provider (already sorted by newest)
             featured.extend(provider.models[:3])
         return featured
+    
+    def rebuild_index(self) -> None:
+        """Rebuild the model ID -> display name index."""
+        providers = self.get_all_models(include_unavailable=True)
+        self._name_index = {
+            model.id: model.name
+            for provider in providers.values()
+            for model in provider.models
+        }
+    
+    def get_model_name(self, model_id: str) -> str:
+        """Get display name for a model ID, falling back to the ID itself."""
+        if self._name_index is None:
+            self.rebuild_index()
+        return self._name_index.get(model_id, model_id)
 
 
 # Singleton instance
@@ -0,0 +1,42 @@
+"""Freeze the current settings into app/_frozen_settings.py.
+
+Run from the backend directory when building a deployment image:
+    
+    python scripts/freeze_settings.py
+
+get_settings() then loads these literal values at startup instead of
+parsing the environment and .env. Delete the generated file to go back to
+environment-based settings. The file contains API keys - never commit it.
+"""
+
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.config import Settings  # noqa: E402
+
+OUTPUT_PATH = BACKEND_DIR / "app" / "_frozen_settings.py"
+
+
+def main():
+    """Write the settings parsed from the environment as a Python module."""
+    settings = Settings.from_env()
+    
+    lines = [
+        '"""Settings frozen by scripts/freeze_settings.py. Do not edit or commit."""',
+        "",
+        "FROZEN_SETTINGS = {",
+    ]
+    for name, value in asdict(settings).items():
+        lines.append(f"    {name!r}: {value!r},")
+    lines.append("}")
+    
+    OUTPUT_PATH.write_text("\n".join(lines) + "\n")
+    print(f"✅ Wrote {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
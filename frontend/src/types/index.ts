@@ -104,6 +104,7 @@ export interface WSModelComplete {
   tokens_output: number | null;
   latency_ms: number | null;
   error: string | null;
+  error_code?: string | null;
 }
 
 export interface WSChatComplete {